@@ -5,6 +5,7 @@
 # test basic imports
 from themachinethatgoesping.gridding.forwardgridder import ForwardGridder
 
+import numpy as np
 from pytest import approx
 
 
@@ -109,3 +110,18 @@ class Test_ForwardGridder_init:
         assert gridder.border_ymax == approx(3 + 1 / 3 + 1 / 6)
         assert gridder.border_zmin == approx(-3)
         assert gridder.border_zmax == approx(5)
+
+    def test_ForwardGridder_from_data_should_ignore_nan_positions(self):
+        sx = [np.nan, 0, 5, np.nan, 10]
+        sy = [1, np.nan, 2, 3, 4]
+        sz = [-1, 0, np.nan, 1, np.nan]
+
+        gridder = ForwardGridder.from_data(0.5, sx, sy, sz)
+
+        assert gridder.xmin == approx(0)
+        assert gridder.xmax == approx(10)
+        assert gridder.nx == 21
+        assert gridder.ymin == approx(1)
+        assert gridder.ny == 7
+        assert gridder.zmin == approx(-1)
+        assert gridder.nz == 5
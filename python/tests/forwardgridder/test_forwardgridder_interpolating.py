@@ -6,6 +6,7 @@
 from themachinethatgoesping.gridding.forwardgridder import ForwardGridder
 
 import numpy as np
+import pytest
 from pytest import approx
 
 
@@ -30,3 +31,61 @@ class Test_ForwardGridder_interpolation:
         ival, iweight = gridder.interpolate_weighted_mean(sx, sy, sz, sv)
         assert np.nansum(ival) == approx(np.nansum(sv))
         assert np.nansum(iweight) == approx(len(sv))
+
+    def test_ForwardGridder_block_mean_should_use_the_cells_of_get_index(self):
+        gridder = ForwardGridder.from_res(0.1, 0, 10, 0, 10, 0, 10)
+
+        # points on half cell boundaries (e.g. 2.15)
+        for x in np.round(np.arange(100) * 0.1 + 0.05, 2):
+            ival, iweight = gridder.interpolate_block_mean([x], [5.0], [5.0], [1.0])
+            ix, iy, iz = np.argwhere(iweight)[0]
+
+            assert ix == gridder.get_x_index(x)
+            assert iy == gridder.get_y_index(5.0)
+            assert iz == gridder.get_z_index(5.0)
+
+    @pytest.mark.parametrize("skip_invalid", [True, False])
+    @pytest.mark.parametrize(
+        "method", ["interpolate_block_mean", "interpolate_weighted_mean"]
+    )
+    @pytest.mark.parametrize(
+        "options, tolerance",
+        [
+            ({"presort": True}, {}),
+            ({"dtype": np.float32}, {"rel": 1e-5, "abs": 1e-5}),
+        ],
+        ids=["presort", "float32"],
+    )
+    def test_ForwardGridder_options_should_not_change_the_result(
+        self, gridder_and_points, method, skip_invalid, options, tolerance
+    ):
+        gridder, points = gridder_and_points
+        interpolate = getattr(gridder, method)
+
+        ival, iweight = interpolate(*points, skip_invalid=skip_invalid)
+
+        dtype = options.get("dtype", np.float64)
+        ival_opt, iweight_opt = interpolate(
+            *points,
+            *gridder.get_empty_grd_images(dtype),
+            skip_invalid=skip_invalid,
+            presort=options.get("presort", False)
+        )
+
+        assert ival_opt.dtype == dtype
+        assert iweight_opt.dtype == dtype
+        assert ival_opt == approx(ival, **tolerance)
+        assert iweight_opt == approx(iweight, **tolerance)
+
+
+@pytest.fixture
+def gridder_and_points():
+    """gridder for the range 0-10 and points that partly lie outside the grid or have NaN values"""
+    rng = np.random.default_rng(42)
+    sx, sy, sz = rng.random((3, 1000)) * 14 - 2
+    sv = rng.random(1000)
+    sv[::50] = np.nan
+
+    gridder = ForwardGridder.from_res(0.5, 0, 10, 0, 10, 0, 10)
+
+    return gridder, (sx, sy, sz, sv)
@@ -6,8 +6,12 @@
 from themachinethatgoesping.gridding.functions import gridfunctions as grdf
 
 import numpy as np
+import pytest
 from pytest import approx
 
+# xmin, xres, nx, ymin, yres, ny, zmin, zres, nz
+GRID = (-5.0, 0.5, 21, -6.0, 0.7, 15, -3.0, 0.3, 21)
+
 
 # define class for grouping (test sections)
 class Test_echogrids_functions_gridfunctions:
@@ -25,3 +29,156 @@ class Test_echogrids_functions_gridfunctions:
             [np.min(sx), np.max(sx), np.min(sy), np.max(sy), np.min(sz), np.max(sz)],
         ):
             assert grd_result == approx(np_result)
+
+    def test_get_minmax_should_handle_single_and_empty_arrays(self):
+        sx = np.array([1.0])
+        sy = np.array([-2.0])
+        sz = np.array([3.0])
+
+        assert grdf.get_minmax(sx, sy, sz) == approx((1, 1, -2, -2, 3, 3))
+
+        empty = np.array([], dtype=np.float64)
+        assert np.all(np.isnan(grdf.get_minmax(empty, empty, empty)))
+
+    def test_get_minmax_should_ignore_nan_values(self):
+        sx = np.array([np.nan, 1.0, -3.0, np.nan, 2.0])
+        sy = np.array([0.5, np.nan, -1.0, 4.0, np.nan])
+        sz = np.array([np.nan, np.nan, np.nan, np.nan, np.nan])
+
+        minmax = grdf.get_minmax(sx, sy, sz)
+        assert minmax[:4] == approx((-3, 2, -1, 4))
+        assert np.all(np.isnan(minmax[4:]))
+
+    @pytest.mark.parametrize(
+        "grd_function", [grdf.grd_block_mean, grdf.grd_weighted_mean]
+    )
+    def test_grd_functions_should_not_depend_on_the_number_of_chunks(
+        self, grd_function
+    ):
+        rng = np.random.default_rng(42)
+        sx, sy, sz = rng.normal(0, 4, (3, 1000))
+        sv = rng.random(1000)
+        sv[::50] = np.nan
+        shape = (GRID[2], GRID[5], GRID[8])
+
+        for skip_invalid in (True, False):
+            ival_serial, iweight_serial = grd_function(
+                sx,
+                sy,
+                sz,
+                sv,
+                *GRID,
+                np.zeros(shape),
+                np.zeros(shape),
+                skip_invalid,
+                num_chunks=1
+            )
+
+            for num_chunks in (3, 8):
+                ival, iweight = grd_function(
+                    sx,
+                    sy,
+                    sz,
+                    sv,
+                    *GRID,
+                    np.zeros(shape),
+                    np.zeros(shape),
+                    skip_invalid,
+                    num_chunks=num_chunks
+                )
+
+                assert ival == approx(ival_serial)
+                assert iweight == approx(iweight_serial)
+
+    @pytest.mark.parametrize(
+        "grd_function", [grdf.grd_block_mean, grdf.grd_weighted_mean]
+    )
+    def test_grd_functions_should_accept_default_arguments_and_any_input_layout(
+        self, grd_function
+    ):
+        rng = np.random.default_rng(42)
+        points = rng.normal(0, 4, (4, 200))
+        shape = (GRID[2], GRID[5], GRID[8])
+
+        ival, iweight = grd_function(*points, *GRID, np.zeros(shape), np.zeros(shape))
+
+        # strided views
+        ival_strided, iweight_strided = grd_function(
+            *np.asfortranarray(points), *GRID, np.zeros(shape), np.zeros(shape)
+        )
+        assert ival_strided == approx(ival)
+        assert iweight_strided == approx(iweight)
+
+        # float32 positions and integer values
+        ival_int, iweight_int = grd_function(
+            *points[:3].astype(np.float32),
+            np.ones(200, dtype=np.int64),
+            *GRID,
+            np.zeros(shape),
+            np.zeros(shape)
+        )
+        assert np.sum(iweight_int) == approx(np.sum(ival_int))
+
+    def test_get_num_chunks_should_depend_on_points_per_cell(self, monkeypatch):
+        # explicit number of threads (independent of the test machine)
+        monkeypatch.setattr(grdf.numba, "get_num_threads", lambda: 8)
+
+        # a small batch into a large grid is scattered serially into the images
+        assert grdf.get_num_chunks(1000, 201**3) == 1
+        assert grdf.get_num_chunks(0, 201**3) == 1
+
+        # 2e6 points on a 200^3 grid are split for the weighted mean only
+        # (limited to 1 + 4 chunks by the 128 MiB of chunk images per chunk)
+        assert grdf.get_num_chunks(2 * 10**6, 200**3) == 5
+        assert grdf.get_num_chunks(2 * 10**6, 100**3) == 8
+        assert (
+            grdf.get_num_chunks(
+                2 * 10**6, 200**3, 8, grdf.BLOCK_MEAN_MIN_POINTS_PER_CELL
+            )
+            == 1
+        )
+        assert (
+            grdf.get_num_chunks(
+                4 * 10**6, 200**3, 8, grdf.BLOCK_MEAN_MIN_POINTS_PER_CELL
+            )
+            == 5
+        )
+
+        # no more chunks than points
+        assert grdf.get_num_chunks(3, 1) == 3
+
+        # the additional chunk images are limited by MAX_CHUNK_IMAGES_BYTES
+        num_cells = grdf.MAX_CHUNK_IMAGES_BYTES // 16
+        assert grdf.get_num_chunks(10**12, num_cells) == 2
+        assert grdf.get_num_chunks(10**12, num_cells, 4) == 3
+
+    @pytest.mark.parametrize(
+        "grd_function", [grdf.grd_block_mean, grdf.grd_weighted_mean]
+    )
+    def test_grd_functions_should_accumulate_small_batches(self, grd_function):
+        rng = np.random.default_rng(42)
+        sx, sy, sz = rng.normal(0, 4, (3, 2000))
+        sv = rng.random(2000)
+        sv[::50] = np.nan
+        shape = (GRID[2], GRID[5], GRID[8])
+
+        ival, iweight = grd_function(
+            sx, sy, sz, sv, *GRID, np.zeros(shape), np.zeros(shape)
+        )
+
+        # accumulate batches into the same (also non contiguous) images
+        ival_batches = np.zeros(shape)
+        iweight_batches = np.zeros(shape[::-1]).T
+        for b in range(0, 2000, 100):
+            grd_function(
+                sx[b : b + 100],
+                sy[b : b + 100],
+                sz[b : b + 100],
+                sv[b : b + 100],
+                *GRID,
+                ival_batches,
+                iweight_batches
+            )
+
+        assert ival_batches == approx(ival)
+        assert iweight_batches == approx(iweight)
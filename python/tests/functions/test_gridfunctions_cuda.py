@@ -0,0 +1,61 @@
+# SPDX-FileCopyrightText: 2022 - 2023 Peter Urban, Ghent University
+#
+# SPDX-License-Identifier: MPL-2.0
+
+# test basic imports
+from themachinethatgoesping.gridding.functions import gridfunctions as grdf
+from themachinethatgoesping.gridding.functions import gridfunctions_cuda as grdf_cuda
+from themachinethatgoesping.gridding.forwardgridder import ForwardGridder
+
+import numpy as np
+import pytest
+from numba import cuda
+from pytest import approx
+
+
+# define class for grouping (test sections)
+@pytest.mark.skipif(not cuda.is_available(), reason="no CUDA device available")
+class Test_echogrids_functions_gridfunctions_cuda:
+    @pytest.mark.parametrize("name", ["grd_block_mean", "grd_weighted_mean"])
+    @pytest.mark.parametrize("skip_invalid", [True, False])
+    @pytest.mark.parametrize(
+        "dtype, tolerance",
+        [(np.float64, {}), (np.float32, {"rel": 1e-5, "abs": 1e-5})],
+        ids=["float64", "float32"],
+    )
+    def test_cuda_functions_should_reproduce_cpu_functions(
+        self, name, skip_invalid, dtype, tolerance
+    ):
+        rng = np.random.default_rng(42)
+        sx, sy, sz = rng.normal(0, 4, (3, 1000))
+        sv = rng.random(1000)
+        sv[::50] = np.nan
+
+        # points on half cell boundaries
+        sx[1:100:2] = np.round(np.arange(50) * 0.1 - 2.45, 2)
+
+        gridder = ForwardGridder(0.1, 0.7, 0.3, -5, 5, -6, 4, -3, 3)
+
+        ival, iweight = getattr(grdf, name)(
+            sx,
+            sy,
+            sz,
+            sv,
+            *gridder._get_min_and_offset(),
+            *gridder.get_empty_grd_images(dtype),
+            skip_invalid,
+        )
+        ival_cuda, iweight_cuda = getattr(grdf_cuda, name)(
+            sx,
+            sy,
+            sz,
+            sv,
+            *gridder._get_min_and_offset(),
+            *gridder.get_empty_grd_images(dtype),
+            skip_invalid,
+        )
+
+        assert ival_cuda.dtype == dtype
+        assert iweight_cuda.dtype == dtype
+        assert ival_cuda == approx(ival, **tolerance)
+        assert iweight_cuda == approx(iweight, **tolerance)
@@ -158,17 +158,23 @@ class ForwardGridder:
         self.border_zmin = self.zmin - self.zres / 2.0
         self.border_zmax = self.zmax + self.zres / 2.0
 
-    def get_empty_grd_images(self) -> tuple:
+    def get_empty_grd_images(self, dtype: np.dtype = np.float64) -> tuple:
         """create empty num and sum grid images
 
+        Parameters
+        ----------
+        dtype : np.dtype, optional
+            data type of the images (np.float64 or np.float32). float32 images halve the memory
+            traffic of the gridding functions at reduced precision, by default np.float64
+
         Returns
         -------
         (image_values, image_weights):
             image_values: summed value for each grid position
             image_weights: weights for each grid position
         """
-        image_values = np.zeros((self.nx, self.ny, self.nz)).astype(np.float64)
-        image_weights = np.zeros((self.nx, self.ny, self.nz)).astype(np.float64)
+        image_values = np.zeros((self.nx, self.ny, self.nz), dtype=dtype)
+        image_weights = np.zeros((self.nx, self.ny, self.nz), dtype=dtype)
 
         return image_values, image_weights
 
@@ -181,6 +187,7 @@ class ForwardGridder:
         image_values: np.ndarray = None,
         image_weights: np.ndarray = None,
         skip_invalid: bool = True,
+        presort: bool = False,
     ) -> tuple:
         """interpolate 3D points onto 3d images using block mean interpolation
 
@@ -200,6 +207,9 @@ class ForwardGridder:
             Image with weights. If None a new image will be created. Dimensions must fit the internal nx,ny,nz
         skip_invalid : bool, optional
             skip values that exceed border_xmin, _xmax, _ymin, _ymax, _zmin, _zmax. Otherwise throw exception by default True
+        presort : bool, optional
+            sort the points by grid block (morton order) before gridding. This improves cache usage for large grids
+            but costs an additional sort of the points, by default False
 
         Returns
         -------
@@ -220,12 +230,12 @@ class ForwardGridder:
                 self.ny,
                 self.nz,
             ), "ERROR: image_weight dimensions do not fit ForwardGridder dimensions!"
+            assert (
+                image_values.dtype == image_weights.dtype
+            ), "ERROR: image_values and image_weights must have the same dtype!"
 
         return grdf.grd_block_mean(
-            np.array(sx),
-            np.array(sy),
-            np.array(sz),
-            np.array(s_val),
+            *self._get_point_arrays(sx, sy, sz, s_val, presort, image_values.dtype),
             *self._get_min_and_offset(),
             image_values=image_values,
             image_weights=image_weights,
@@ -241,6 +251,7 @@ class ForwardGridder:
         image_values: np.ndarray = None,
         image_weights: np.ndarray = None,
         skip_invalid: bool = True,
+        presort: bool = False,
     ):
         """interpolate 3D points onto 3d images using weighted mean interpolation
 
@@ -260,6 +271,9 @@ class ForwardGridder:
             Image with weights. If None a new image will be created. Dimensions must fit the internal nx,ny,nz
         skip_invalid : bool, optional
             skip values that exceed border_xmin, _xmax, _ymin, _ymax, _zmin, _zmax. Otherwise throw exception by default True
+        presort : bool, optional
+            sort the points by grid block (morton order) before gridding. This improves cache usage for large grids
+            but costs an additional sort of the points, by default False
 
         Returns
         -------
@@ -280,12 +294,12 @@ class ForwardGridder:
                 self.ny,
                 self.nz,
             ), "ERROR: image_weight dimensions do not fit ForwardGridder dimensions!"
+            assert (
+                image_values.dtype == image_weights.dtype
+            ), "ERROR: image_values and image_weights must have the same dtype!"
 
         return grdf.grd_weighted_mean(
-            np.array(sx),
-            np.array(sy),
-            np.array(sz),
-            np.array(s_val),
+            *self._get_point_arrays(sx, sy, sz, s_val, presort, image_values.dtype),
             *self._get_min_and_offset(),
             image_values=image_values,
             image_weights=image_weights,
@@ -483,29 +497,34 @@ class ForwardGridder:
 
     def get_x_coordinates(self) -> list:
         """return valid x grid coordinates as list"""
-        coordinates = []
-        for i in range(self.nx):
-            coordinates.append(self.get_x_value(i))
-
-        return coordinates
+        return grdf.get_values(self.nx, self.xmin, self.xres).tolist()
 
     def get_y_coordinates(self) -> list:
         """return valid y grid coordinates as list"""
-        coordinates = []
-        for i in range(self.ny):
-            coordinates.append(self.get_y_value(i))
-
-        return coordinates
+        return grdf.get_values(self.ny, self.ymin, self.yres).tolist()
 
     def get_z_coordinates(self) -> list:
         """return valid z grid coordinates as list"""
-        coordinates = []
-        for i in range(self.nz):
-            coordinates.append(self.get_z_value(i))
-
-        return coordinates
+        return grdf.get_values(self.nz, self.zmin, self.zres).tolist()
 
     # --- private helper functions ---
+    def _get_point_arrays(
+        self,
+        sx: ArrayLike,
+        sy: ArrayLike,
+        sz: ArrayLike,
+        s_val: ArrayLike,
+        presort: bool = False,
+        value_dtype: np.dtype = np.float64,
+    ):
+        sx, sy, sz, s_val = grdf.get_point_arrays(sx, sy, sz, s_val, value_dtype)
+
+        if presort:
+            order = grdf.get_morton_order(sx, sy, sz, *self._get_min_and_offset())
+            return sx[order], sy[order], sz[order], s_val[order]
+
+        return sx, sy, sz, s_val
+
     def _get_min_and_offset(self):
         return (
             self.xmin,
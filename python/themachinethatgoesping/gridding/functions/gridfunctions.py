@@ -9,18 +9,44 @@ Helper functions for the gridder class, implemented using numba
 
 import math
 
+import numba
 import numpy as np
-from numba import njit
+from numba import njit, prange
 
 from . import helperfunctions as hlp
 
+# number of points for which grd_block_mean computes the grid cells in one batch
+INDEX_BATCH_SIZE = 1024
+
+# maximum memory of the additional per chunk images of the grd_ functions
+MAX_CHUNK_IMAGES_BYTES = 512 * 1024**2
+
+# minimum number of points per grid cell for which the grd_ functions use per chunk
+# images (see get_num_chunks). Zeroing and adding one chunk image costs ~9 ns per cell,
+# gridding a point ~110 ns (weighted mean) or ~20 ns (block mean) (200^3 grid,
+# single core measurement). The break even is therefore at ~1/12 (weighted mean) and
+# ~1/2 (block mean) points per cell, independent of the number of threads.
+WEIGHTED_MEAN_MIN_POINTS_PER_CELL = 1 / 8
+BLOCK_MEAN_MIN_POINTS_PER_CELL = 1 / 2
+
 # --- some useful functions ---
 
 
-@njit
+@njit(**hlp.NJIT_OPTIONS)
+def get_first_non_nan(s: np.array) -> float:
+    """returns the first value of s that is not NaN (NaN if there is none)"""
+    for val in s:
+        if not np.isnan(val):
+            return val
+
+    return np.nan
+
+
+@njit(**hlp.NJIT_OPTIONS)
 def get_minmax(sx: np.array, sy: np.array, sz: np.array) -> tuple:
     """returns the min/max value of three lists (same size).
     Sometimes faster than separate numpy functions because it only loops once.
+    NaN values are ignored.
 
     Parameters
     ----------
@@ -39,56 +65,64 @@ def get_minmax(sx: np.array, sy: np.array, sz: np.array) -> tuple:
 
     assert len(sx) == len(sy) == len(sz), "expected length of all arrays to be the same"
 
-    minx = np.nan
-    maxx = np.nan
-    miny = np.nan
-    maxy = np.nan
-    minz = np.nan
-    maxz = np.nan
+    # start from the first non NaN value, all comparisons with NaN are False,
+    # so the NaN values are skipped without additional branches
+    minx = maxx = float(get_first_non_nan(sx))
+    miny = maxy = float(get_first_non_nan(sy))
+    minz = maxz = float(get_first_non_nan(sz))
 
     for i in range(len(sx)):
         x = sx[i]
         y = sy[i]
         z = sz[i]
 
-        if not x > minx:
+        if x < minx:
             minx = x
-        if not x < maxx:
+        elif x > maxx:
             maxx = x
-        if not y > miny:
+        if y < miny:
             miny = y
-        if not y < maxy:
+        elif y > maxy:
             maxy = y
-        if not z > minz:
+        if z < minz:
             minz = z
-        if not z < maxz:
+        elif z > maxz:
             maxz = z
 
     return minx, maxx, miny, maxy, minz, maxz
 
 
 # --- static helper functions for the gridder class (implemented using numba) ---
-@njit
+@njit(**hlp.NJIT_OPTIONS)
 def get_index(val: float, grd_val_min: float, grd_res: float) -> int:
     return hlp.round_int((val - grd_val_min) / grd_res)
 
 
-@njit
+@njit(**hlp.NJIT_OPTIONS)
 def get_index_fraction(val: float, grd_val_min: float, grd_res: float) -> float:
     return (val - grd_val_min) / grd_res
 
 
-@njit
+@njit(**hlp.NJIT_OPTIONS)
 def get_value(index: float, grd_val_min: float, grd_res: float) -> float:
     return grd_val_min + grd_res * float(index)
 
 
-@njit
+@njit(**hlp.NJIT_OPTIONS)
+def get_values(num_values: int, grd_val_min: float, grd_res: float) -> np.ndarray:
+    values = np.empty(num_values, dtype=np.float64)
+    for i in range(num_values):
+        values[i] = get_value(i, grd_val_min, grd_res)
+
+    return values
+
+
+@njit(**hlp.NJIT_OPTIONS)
 def get_grd_value(value: float, grd_val_min: float, grd_res: float) -> float:
     return get_value(get_index(value, grd_val_min, grd_res), grd_val_min, grd_res)
 
 
-@njit
+@njit(**hlp.NJIT_OPTIONS)
 def get_index_weights(
     fraction_index_x: float, fraction_index_y: float, fraction_index_z: float
 ) -> tuple:
@@ -96,21 +130,21 @@ def get_index_weights(
     Return a vector with fraction and weights for the neighboring grid cells.
     """
 
-    ifraction_x = fraction_index_x % 1
-    ifraction_y = fraction_index_y % 1
-    ifraction_z = fraction_index_z % 1
+    ix1 = int(math.floor(fraction_index_x))
+    iy1 = int(math.floor(fraction_index_y))
+    iz1 = int(math.floor(fraction_index_z))
+    ix2 = ix1 + 1
+    iy2 = iy1 + 1
+    iz2 = iz1 + 1
+
+    ifraction_x = fraction_index_x - ix1
+    ifraction_y = fraction_index_y - iy1
+    ifraction_z = fraction_index_z - iz1
 
     fraction_x = 1 - ifraction_x
     fraction_y = 1 - ifraction_y
     fraction_z = 1 - ifraction_z
 
-    ix1 = math.floor(fraction_index_x)
-    ix2 = math.ceil(fraction_index_x)
-    iy1 = math.floor(fraction_index_y)
-    iy2 = math.ceil(fraction_index_y)
-    iz1 = math.floor(fraction_index_z)
-    iz2 = math.ceil(fraction_index_z)
-
     X = np.array([ix1, ix1, ix1, ix1, ix2, ix2, ix2, ix2])
     Y = np.array([iy1, iy1, iy2, iy2, iy1, iy1, iy2, iy2])
     Z = np.array([iz1, iz2, iz1, iz2, iz1, iz2, iz1, iz2])
@@ -139,12 +173,26 @@ def get_index_weights(
     return X, Y, Z, WEIGHT
 
 
-@njit()
-def grd_weighted_mean(
+@njit(**hlp.NJIT_OPTIONS)
+def spread_bits_3d(val: int) -> int:
+    """spread the lowest 21 bits of val such that two zero bits follow each bit
+    (used to create morton codes)
+    """
+
+    val &= 0x1FFFFF
+    val = (val | val << 32) & 0x1F00000000FFFF
+    val = (val | val << 16) & 0x1F0000FF0000FF
+    val = (val | val << 8) & 0x100F00F00F00F00F
+    val = (val | val << 4) & 0x10C30C30C30C30C3
+    val = (val | val << 2) & 0x1249249249249249
+    return val
+
+
+@njit(**hlp.NJIT_OPTIONS)
+def get_morton_order(
     sx: np.array,
     sy: np.array,
     sz: np.array,
-    sv: np.array,
     xmin: float,
     xres: float,
     nx: int,
@@ -154,72 +202,650 @@ def grd_weighted_mean(
     zmin: float,
     zres: float,
     nz: int,
+    block_shift: int = 3,
+) -> np.ndarray:
+    """returns the indices that sort the points by the morton (z-order) code of their
+    grid block. A grid block contains 2**block_shift grid cells along each axis.
+    Points outside the grid are assigned to the closest block.
+
+    Gridding the sorted points makes consecutive points hit the same region of the
+    images, which reduces cache misses for large grids.
+
+    Parameters
+    ----------
+    sx : np.array
+        1D array with x positions (same size)
+    sy : np.array
+        1D array with y positions (same size)
+    sz : np.array
+        1D array with z positions (same size)
+    xmin, xres, nx, ymin, yres, ny, zmin, zres, nz
+        grid parameters (see ForwardGridder)
+    block_shift : int, optional
+        log2 of the block size in grid cells, by default 3
+
+    Returns
+    -------
+    np.ndarray
+        indices that sort the points (see np.argsort)
+    """
+
+    keys = np.empty(len(sx), dtype=np.int64)
+
+    for i in range(len(sx)):
+        ix = min(max(get_index(sx[i], xmin, xres), 0), nx - 1) >> block_shift
+        iy = min(max(get_index(sy[i], ymin, yres), 0), ny - 1) >> block_shift
+        iz = min(max(get_index(sz[i], zmin, zres), 0), nz - 1) >> block_shift
+
+        keys[i] = (
+            spread_bits_3d(ix) | (spread_bits_3d(iy) << 1) | (spread_bits_3d(iz) << 2)
+        )
+
+    return np.argsort(keys)
+
+
+@njit(inline="always", **hlp.NJIT_OPTIONS)
+def add_value_at_offset(
+    image_values: np.ndarray,
+    image_weights: np.ndarray,
+    offset: int,
+    v: float,
+    w: float,
+):
+    """add value v with weight w at offset of the flattened images (no checks)"""
+    image_values[offset] += v * w
+    image_weights[offset] += w
+
+
+@njit(inline="always", **hlp.NJIT_OPTIONS)
+def add_weighted_value(
+    image_values: np.ndarray,
+    image_weights: np.ndarray,
+    ix: int,
+    iy: int,
+    iz: int,
+    v: float,
+    w: float,
+    nx: int,
+    ny: int,
+    nz: int,
+    skip_invalid: bool = True,
+):
+    """add value v with weight w to the grid cell (ix, iy, iz) of the flattened
+    (C order) images. v must be finite.
+    """
+
+    if w == 0:
+        return
+
+    if not skip_invalid:
+        # clamp to the closest grid cell (min/max instead of branches)
+        ix = min(max(ix, 0), nx - 1)
+        iy = min(max(iy, 0), ny - 1)
+        iz = min(max(iz, 0), nz - 1)
+    else:
+        # bitwise or: one combined test instead of six short circuit branches
+        if (ix < 0) | (iy < 0) | (iz < 0) | (ix >= nx) | (iy >= ny) | (iz >= nz):
+            return
+
+    add_value_at_offset(image_values, image_weights, (ix * ny + iy) * nz + iz, v, w)
+
+
+@njit(**hlp.NJIT_OPTIONS)
+def add_trilinear_value(
     image_values: np.ndarray,
     image_weights: np.ndarray,
+    fraction_index_x: float,
+    fraction_index_y: float,
+    fraction_index_z: float,
+    v: float,
+    nx: int,
+    ny: int,
+    nz: int,
     skip_invalid: bool = True,
-) -> tuple:
+):
+    """
+    Add value v to the 8 grid cells that surround the fractional index using
+    trilinear weights.
+    Same weights as get_index_weights, but without creating the index/weight arrays.
+    Non finite values are skipped.
+    """
 
-    for i in range(len(sx)):
-        x = sx[i]
-        y = sy[i]
-        z = sz[i]
-        v = sv[i]
+    if not np.isfinite(v):
+        return
+
+    ix1 = int(math.floor(fraction_index_x))
+    iy1 = int(math.floor(fraction_index_y))
+    iz1 = int(math.floor(fraction_index_z))
+    ix2 = ix1 + 1
+    iy2 = iy1 + 1
+    iz2 = iz1 + 1
 
-        IX, IY, IZ, WEIGHT = get_index_weights(
-            get_index_fraction(x, xmin, xres),
-            get_index_fraction(y, ymin, yres),
-            get_index_fraction(z, zmin, zres),
+    ifraction_x = fraction_index_x - ix1
+    ifraction_y = fraction_index_y - iy1
+    ifraction_z = fraction_index_z - iz1
+
+    fraction_x = 1 - ifraction_x
+    fraction_y = 1 - ifraction_y
+    fraction_z = 1 - ifraction_z
+
+    vxy = fraction_x * fraction_y
+    vxiy = fraction_x * ifraction_y
+    vixy = ifraction_x * fraction_y
+    vixiy = ifraction_x * ifraction_y
+
+    # the 8 cells are written by explicit (inlined) calls instead of a loop over
+    # index/weight arrays, which lets llvm schedule the independent scatters together
+    # fast path: all 8 cells are inside the grid, no per cell checks necessary
+    if (ix1 >= 0) & (iy1 >= 0) & (iz1 >= 0) & (ix2 < nx) & (iy2 < ny) & (iz2 < nz):
+        offset = (ix1 * ny + iy1) * nz + iz1
+        ox = ny * nz
+
+        # fmt: off
+        add_value_at_offset(image_values, image_weights, offset, v, vxy * fraction_z)
+        add_value_at_offset(image_values, image_weights, offset + 1, v, vxy * ifraction_z)
+        add_value_at_offset(image_values, image_weights, offset + nz, v, vxiy * fraction_z)
+        add_value_at_offset(image_values, image_weights, offset + nz + 1, v, vxiy * ifraction_z)
+        add_value_at_offset(image_values, image_weights, offset + ox, v, vixy * fraction_z)
+        add_value_at_offset(image_values, image_weights, offset + ox + 1, v, vixy * ifraction_z)
+        add_value_at_offset(image_values, image_weights, offset + ox + nz, v, vixiy * fraction_z)
+        add_value_at_offset(image_values, image_weights, offset + ox + nz + 1, v, vixiy * ifraction_z)
+        # fmt: on
+        return
+
+    # fmt: off
+    add_weighted_value(image_values, image_weights, ix1, iy1, iz1, v, vxy * fraction_z, nx, ny, nz, skip_invalid)
+    add_weighted_value(image_values, image_weights, ix1, iy1, iz2, v, vxy * ifraction_z, nx, ny, nz, skip_invalid)
+    add_weighted_value(image_values, image_weights, ix1, iy2, iz1, v, vxiy * fraction_z, nx, ny, nz, skip_invalid)
+    add_weighted_value(image_values, image_weights, ix1, iy2, iz2, v, vxiy * ifraction_z, nx, ny, nz, skip_invalid)
+    add_weighted_value(image_values, image_weights, ix2, iy1, iz1, v, vixy * fraction_z, nx, ny, nz, skip_invalid)
+    add_weighted_value(image_values, image_weights, ix2, iy1, iz2, v, vixy * ifraction_z, nx, ny, nz, skip_invalid)
+    add_weighted_value(image_values, image_weights, ix2, iy2, iz1, v, vixiy * fraction_z, nx, ny, nz, skip_invalid)
+    add_weighted_value(image_values, image_weights, ix2, iy2, iz2, v, vixiy * ifraction_z, nx, ny, nz, skip_invalid)
+    # fmt: on
+
+
+def get_num_chunks(
+    num_points: int,
+    num_cells: int,
+    itemsize: int = 8,
+    min_points_per_cell: float = WEIGHTED_MEAN_MIN_POINTS_PER_CELL,
+) -> int:
+    """returns the number of point chunks that are processed in parallel by the grd_
+    functions. The first chunk is scattered directly into the images, every other chunk
+    into its own images (values and weights) that are added up afterwards.
+    Zeroing and adding these images costs O(num_cells) per chunk, so the points are
+    only split if there are at least min_points_per_cell points per grid cell.
+    The additional images are further limited to MAX_CHUNK_IMAGES_BYTES.
+    This is evaluated in python, because numba.get_num_threads() can not be used in
+    cached functions.
+
+    Parameters
+    ----------
+    num_points : int
+        number of points that are gridded
+    num_cells : int
+        number of grid cells (nx * ny * nz)
+    itemsize : int, optional
+        bytes per image value, by default 8
+    min_points_per_cell : float, optional
+        minimum number of points per grid cell for splitting the points,
+        by default WEIGHTED_MEAN_MIN_POINTS_PER_CELL
+
+    Returns
+    -------
+    int
+        number of chunks (1 means serial gridding directly into the images)
+    """
+    num_cells = max(num_cells, 1)
+    if num_points < num_cells * min_points_per_cell:
+        return 1
+
+    max_chunks_memory = 1 + MAX_CHUNK_IMAGES_BYTES // (2 * num_cells * itemsize)
+
+    return max(1, min(numba.get_num_threads(), num_points, max_chunks_memory))
+
+
+@njit(parallel=True, **hlp.NJIT_OPTIONS)
+def reduce_chunk_images(
+    chunk_values: np.ndarray,
+    chunk_weights: np.ndarray,
+    image_values: np.ndarray,
+    image_weights: np.ndarray,
+):
+    """add the flattened per chunk images (rows of chunk_values/chunk_weights) to the
+    flattened images
+    """
+
+    for offset in prange(chunk_values.shape[1]):
+        for c in range(chunk_values.shape[0]):
+            image_values[offset] += chunk_values[c, offset]
+            image_weights[offset] += chunk_weights[c, offset]
+
+
+@njit(**hlp.NJIT_OPTIONS)
+def get_block_indices(
+    s: np.array,
+    grd_val_min: float,
+    grd_res: float,
+    n: int,
+    skip_invalid: bool,
+    indices: np.ndarray,
+    valid: np.ndarray,
+):
+    """compute the grid cell indices of the positions s along one axis (block mean).
+    Indices outside the grid are clamped to the closest grid cell. If skip_invalid is
+    set, these positions are additionally marked as invalid in valid.
+    The indices are computed using get_index (division by the resolution), so that
+    points on half cell boundaries end up in the same cell as reported by get_index.
+
+    Parameters
+    ----------
+    s : np.array
+        positions along one axis
+    grd_val_min : float
+        grid value of the first grid cell along this axis
+    grd_res : float
+        grid resolution along this axis
+    n : int
+        number of grid cells along this axis
+    skip_invalid : bool
+        mark positions outside of the grid as invalid
+    indices : np.ndarray
+        output array for the indices (same size as s)
+    valid : np.ndarray
+        bool array (same size as s). Positions outside the grid are set to False if
+        skip_invalid is set.
+    """
+
+    for k in range(len(s)):
+        i = get_index(s[k], grd_val_min, grd_res)
+
+        if skip_invalid:
+            valid[k] &= (i >= 0) & (i < n)
+
+        indices[k] = min(max(i, 0), n - 1)
+
+
+@njit(**hlp.NJIT_OPTIONS)
+def grd_weighted_mean_points(
+    sx: np.array,
+    sy: np.array,
+    sz: np.array,
+    sv: np.array,
+    start: int,
+    end: int,
+    xmin: float,
+    xres: float,
+    nx: int,
+    ymin: float,
+    yres: float,
+    ny: int,
+    zmin: float,
+    zres: float,
+    nz: int,
+    image_values: np.ndarray,
+    image_weights: np.ndarray,
+    skip_invalid: bool,
+):
+    """add the points [start, end) to the flattened images using trilinear weights
+    (serial)
+    """
+
+    # multiplying with the inverse resolution is cheaper than dividing for each point
+    inv_xres = 1.0 / xres
+    inv_yres = 1.0 / yres
+    inv_zres = 1.0 / zres
+
+    for i in range(start, end):
+        add_trilinear_value(
+            image_values,
+            image_weights,
+            (sx[i] - xmin) * inv_xres,
+            (sy[i] - ymin) * inv_yres,
+            (sz[i] - zmin) * inv_zres,
+            sv[i],
+            nx,
+            ny,
+            nz,
+            skip_invalid,
         )
 
-        for i_ in range(len(IX)):
-            ix = int(IX[i_])
-            iy = int(IY[i_])
-            iz = int(IZ[i_])
-            w = WEIGHT[i_]
-
-            if w == 0:
-                continue
-
-            if not skip_invalid:
-                if ix < 0:
-                    ix = 0
-                if iy < 0:
-                    iy = 0
-                if iz < 0:
-                    iz = 0
-
-                if abs(ix) >= nx:
-                    ix = nx - 1
-                if abs(iy) >= ny:
-                    iy = ny - 1
-                if abs(iz) >= nz:
-                    iz = nz - 1
-            else:
-                if ix < 0:
-                    continue
-                if iy < 0:
-                    continue
-                if iz < 0:
-                    continue
-
-                if abs(ix) >= nx:
-                    continue
-                if abs(iy) >= ny:
-                    continue
-                if abs(iz) >= nz:
-                    continue
-
-            # print(ix,iy,iz,v,w)
-            #if v >= 0:
-            if np.isfinite(v):
-                image_values[ix][iy][iz] += v * w
-                image_weights[ix][iy][iz] += w
+
+@njit(**hlp.NJIT_OPTIONS)
+def grd_block_mean_points(
+    sx: np.array,
+    sy: np.array,
+    sz: np.array,
+    sv: np.array,
+    start: int,
+    end: int,
+    xmin: float,
+    xres: float,
+    nx: int,
+    ymin: float,
+    yres: float,
+    ny: int,
+    zmin: float,
+    zres: float,
+    nz: int,
+    image_values: np.ndarray,
+    image_weights: np.ndarray,
+    skip_invalid: bool,
+):
+    """add the points [start, end) to the flattened images of the grid cells that
+    contain them (serial)
+    """
+
+    # the grid cells are computed for a batch of points before they are scattered
+    # this keeps the index computation free of scatter stores (llvm can vectorize it)
+    batch_size = min(INDEX_BATCH_SIZE, max(end - start, 0))
+    ix = np.empty(batch_size, dtype=np.int64)
+    iy = np.empty(batch_size, dtype=np.int64)
+    iz = np.empty(batch_size, dtype=np.int64)
+    valid = np.empty(batch_size, dtype=np.bool_)
+
+    for batch_start in range(start, end, INDEX_BATCH_SIZE):
+        batch_end = min(batch_start + INDEX_BATCH_SIZE, end)
+        n = batch_end - batch_start
+
+        for k in range(n):
+            valid[k] = np.isfinite(sv[batch_start + k])
+
+        # fmt: off
+        get_block_indices(sx[batch_start:batch_end], xmin, xres, nx, skip_invalid, ix[:n], valid[:n])
+        get_block_indices(sy[batch_start:batch_end], ymin, yres, ny, skip_invalid, iy[:n], valid[:n])
+        get_block_indices(sz[batch_start:batch_end], zmin, zres, nz, skip_invalid, iz[:n], valid[:n])
+        # fmt: on
+
+        for k in range(n):
+            if valid[k]:
+                offset = (ix[k] * ny + iy[k]) * nz + iz[k]
+                image_values[offset] += sv[batch_start + k]
+                image_weights[offset] += 1
+
+
+@njit(**hlp.NJIT_OPTIONS)
+def grd_points(
+    block_mean: bool,
+    sx: np.array,
+    sy: np.array,
+    sz: np.array,
+    sv: np.array,
+    start: int,
+    end: int,
+    xmin: float,
+    xres: float,
+    nx: int,
+    ymin: float,
+    yres: float,
+    ny: int,
+    zmin: float,
+    zres: float,
+    nz: int,
+    image_values: np.ndarray,
+    image_weights: np.ndarray,
+    skip_invalid: bool,
+):
+    """add the points [start, end) to the flattened images using grd_block_mean_points
+    (block_mean) or grd_weighted_mean_points.
+    The gridding method is selected using a flag, because passing the numba functions
+    as arguments prevents the caching of the compiled kernels.
+    """
+    if block_mean:
+        grd_block_mean_points(
+            sx,
+            sy,
+            sz,
+            sv,
+            start,
+            end,
+            xmin,
+            xres,
+            nx,
+            ymin,
+            yres,
+            ny,
+            zmin,
+            zres,
+            nz,
+            image_values,
+            image_weights,
+            skip_invalid,
+        )
+    else:
+        grd_weighted_mean_points(
+            sx,
+            sy,
+            sz,
+            sv,
+            start,
+            end,
+            xmin,
+            xres,
+            nx,
+            ymin,
+            yres,
+            ny,
+            zmin,
+            zres,
+            nz,
+            image_values,
+            image_weights,
+            skip_invalid,
+        )
+
+
+@njit(parallel=True, **hlp.NJIT_OPTIONS)
+def grd_chunked(
+    block_mean: bool,
+    sx: np.array,
+    sy: np.array,
+    sz: np.array,
+    sv: np.array,
+    xmin: float,
+    xres: float,
+    nx: int,
+    ymin: float,
+    yres: float,
+    ny: int,
+    zmin: float,
+    zres: float,
+    nz: int,
+    image_values: np.ndarray,
+    image_weights: np.ndarray,
+    skip_invalid: bool,
+    num_chunks: int,
+):
+    """scatter the points into the flattened images (C order) using grd_points.
+    The points are split into num_chunks chunks that are processed in parallel.
+    The first chunk is scattered into the images, the others into their own images
+    (no race conditions) that are added to the images afterwards.
+    """
+
+    grid = (xmin, xres, nx, ymin, yres, ny, zmin, zres, nz)
+    images = (image_values, image_weights)
+
+    num_points = len(sx)
+    if num_chunks <= 1:
+        grd_points(
+            block_mean, sx, sy, sz, sv, 0, num_points, *grid, *images, skip_invalid
+        )
+        return
+
+    chunk_size = (num_points + num_chunks - 1) // num_chunks
+    num_cells = len(image_values)
+    chunk_values = np.zeros((num_chunks - 1, num_cells), dtype=image_values.dtype)
+    chunk_weights = np.zeros((num_chunks - 1, num_cells), dtype=image_weights.dtype)
+
+    for c in prange(num_chunks):
+        start = c * chunk_size
+        end = min(start + chunk_size, num_points)
+
+        if c == 0:
+            values, weights = image_values, image_weights
+        else:
+            values, weights = chunk_values[c - 1], chunk_weights[c - 1]
+
+        grd_points(
+            block_mean, sx, sy, sz, sv, start, end, *grid, values, weights, skip_invalid
+        )
+
+    reduce_chunk_images(chunk_values, chunk_weights, image_values, image_weights)
+
+
+@njit(**hlp.NJIT_OPTIONS)
+def grd_weighted_mean_kernel(
+    sx: np.array,
+    sy: np.array,
+    sz: np.array,
+    sv: np.array,
+    xmin: float,
+    xres: float,
+    nx: int,
+    ymin: float,
+    yres: float,
+    ny: int,
+    zmin: float,
+    zres: float,
+    nz: int,
+    image_values: np.ndarray,
+    image_weights: np.ndarray,
+    skip_invalid: bool,
+    num_chunks: int,
+):
+    """numba kernel of grd_weighted_mean. The images must be flattened (C order)."""
+    grd_chunked(
+        False,
+        sx,
+        sy,
+        sz,
+        sv,
+        xmin,
+        xres,
+        nx,
+        ymin,
+        yres,
+        ny,
+        zmin,
+        zres,
+        nz,
+        image_values,
+        image_weights,
+        skip_invalid,
+        num_chunks,
+    )
+
+
+@njit(**hlp.NJIT_OPTIONS)
+def grd_block_mean_kernel(
+    sx: np.array,
+    sy: np.array,
+    sz: np.array,
+    sv: np.array,
+    xmin: float,
+    xres: float,
+    nx: int,
+    ymin: float,
+    yres: float,
+    ny: int,
+    zmin: float,
+    zres: float,
+    nz: int,
+    image_values: np.ndarray,
+    image_weights: np.ndarray,
+    skip_invalid: bool,
+    num_chunks: int,
+):
+    """numba kernel of grd_block_mean. The images must be flattened (C order)."""
+    grd_chunked(
+        True,
+        sx,
+        sy,
+        sz,
+        sv,
+        xmin,
+        xres,
+        nx,
+        ymin,
+        yres,
+        ny,
+        zmin,
+        zres,
+        nz,
+        image_values,
+        image_weights,
+        skip_invalid,
+        num_chunks,
+    )
+
+
+# --- gridding functions (python wrappers that prepare the numba kernel arguments) ---
+def get_point_arrays(
+    sx: np.array, sy: np.array, sz: np.array, sv: np.array, value_dtype: np.dtype
+) -> tuple:
+    """returns the point arrays as contiguous arrays
+    (float64 positions, values of type value_dtype)
+    """
+    return (
+        np.ascontiguousarray(sx, dtype=np.float64),
+        np.ascontiguousarray(sy, dtype=np.float64),
+        np.ascontiguousarray(sz, dtype=np.float64),
+        np.ascontiguousarray(sv, dtype=value_dtype),
+    )
+
+
+def _call_grd_kernel(
+    kernel,
+    sx: np.array,
+    sy: np.array,
+    sz: np.array,
+    sv: np.array,
+    xmin: float,
+    xres: float,
+    nx: int,
+    ymin: float,
+    yres: float,
+    ny: int,
+    zmin: float,
+    zres: float,
+    nz: int,
+    image_values: np.ndarray,
+    image_weights: np.ndarray,
+    skip_invalid: bool,
+    num_chunks: int,
+) -> tuple:
+    # the kernels work on flattened images
+    # (views for C contiguous images, copies otherwise)
+    flat_values = np.ascontiguousarray(image_values).reshape(-1)
+    flat_weights = np.ascontiguousarray(image_weights).reshape(-1)
+
+    kernel(
+        *get_point_arrays(sx, sy, sz, sv, image_values.dtype),
+        xmin,
+        xres,
+        nx,
+        ymin,
+        yres,
+        ny,
+        zmin,
+        zres,
+        nz,
+        flat_values,
+        flat_weights,
+        skip_invalid,
+        num_chunks,
+    )
+
+    if not image_values.flags.c_contiguous:
+        image_values[...] = flat_values.reshape(image_values.shape)
+    if not image_weights.flags.c_contiguous:
+        image_weights[...] = flat_weights.reshape(image_weights.shape)
 
     return image_values, image_weights
 
 
-@njit
-def grd_block_mean(
+def grd_weighted_mean(
     sx: np.array,
     sy: np.array,
     sz: np.array,
@@ -236,50 +862,87 @@ def grd_block_mean(
     image_values: np.ndarray,
     image_weights: np.ndarray,
     skip_invalid: bool = True,
+    num_chunks: int = None,
 ) -> tuple:
+    """add the values sv at the positions sx, sy, sz to the images using trilinear
+    weights.
+    If num_chunks is None, it is determined using get_num_chunks.
+    """
+    if num_chunks is None:
+        num_chunks = get_num_chunks(
+            len(sx),
+            nx * ny * nz,
+            image_values.itemsize,
+            WEIGHTED_MEAN_MIN_POINTS_PER_CELL,
+        )
 
-    for i in range(len(sx)):
-        x = sx[i]
-        y = sy[i]
-        z = sz[i]
-        v = sv[i]
-
-        ix = get_index(x, xmin, xres)
-        iy = get_index(y, ymin, yres)
-        iz = get_index(z, zmin, zres)
-
-        if not skip_invalid:
-            if ix < 0:
-                ix = 0
-            if iy < 0:
-                iy = 0
-            if iz < 0:
-                iz = 0
-
-            if abs(ix) >= nx:
-                ix = nx - 1
-            if abs(iy) >= ny:
-                iy = ny - 1
-            if abs(iz) >= nz:
-                iz = nz - 1
-        else:
-            if ix < 0:
-                continue
-            if iy < 0:
-                continue
-            if iz < 0:
-                continue
-
-            if abs(ix) >= nx:
-                continue
-            if abs(iy) >= ny:
-                continue
-            if abs(iz) >= nz:
-                continue
-
-        #if v >= 0:
-        if np.isfinite(v):
-            image_values[ix][iy][iz] += v
-            image_weights[ix][iy][iz] += 1
+    return _call_grd_kernel(
+        grd_weighted_mean_kernel,
+        sx,
+        sy,
+        sz,
+        sv,
+        xmin,
+        xres,
+        nx,
+        ymin,
+        yres,
+        ny,
+        zmin,
+        zres,
+        nz,
+        image_values,
+        image_weights,
+        skip_invalid,
+        num_chunks,
+    )
 
-    return image_values, image_weights
+
+def grd_block_mean(
+    sx: np.array,
+    sy: np.array,
+    sz: np.array,
+    sv: np.array,
+    xmin: float,
+    xres: float,
+    nx: int,
+    ymin: float,
+    yres: float,
+    ny: int,
+    zmin: float,
+    zres: float,
+    nz: int,
+    image_values: np.ndarray,
+    image_weights: np.ndarray,
+    skip_invalid: bool = True,
+    num_chunks: int = None,
+) -> tuple:
+    """add the values sv at the positions sx, sy, sz to the images of the grid cells
+    that contain them.
+    If num_chunks is None, it is determined using get_num_chunks.
+    """
+    if num_chunks is None:
+        num_chunks = get_num_chunks(
+            len(sx), nx * ny * nz, image_values.itemsize, BLOCK_MEAN_MIN_POINTS_PER_CELL
+        )
+
+    return _call_grd_kernel(
+        grd_block_mean_kernel,
+        sx,
+        sy,
+        sz,
+        sv,
+        xmin,
+        xres,
+        nx,
+        ymin,
+        yres,
+        ny,
+        zmin,
+        zres,
+        nz,
+        image_values,
+        image_weights,
+        skip_invalid,
+        num_chunks,
+    )
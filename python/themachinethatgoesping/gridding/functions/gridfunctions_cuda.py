@@ -0,0 +1,281 @@
+# SPDX-FileCopyrightText: 2022 - 2023 Peter Urban, Ghent University
+#
+# SPDX-License-Identifier: MPL-2.0
+
+"""
+CUDA versions of the gridding functions in gridfunctions, implemented using numba.cuda
+
+The kernels run one thread per point and scatter into the images using atomic additions.
+Atomic additions on float64 images require a GPU with compute capability 6.0 or higher.
+"""
+
+import math
+
+import numpy as np
+from numba import cuda
+
+# threads per block used to launch the kernels
+THREADS_PER_BLOCK = 256
+
+
+# --- device functions ---
+@cuda.jit(device=True)
+def round_int(val):
+    """round half away from zero (same as helperfunctions.round_int)"""
+    return int(math.copysign(math.floor(math.fabs(val) + 0.5), val))
+
+
+@cuda.jit(device=True)
+def add_weighted_value(
+    image_values, image_weights, ix, iy, iz, v, w, nx, ny, nz, skip_invalid
+):
+    """atomically add value v with weight w to the grid cell (ix, iy, iz) of the images"""
+
+    if w == 0:
+        return
+
+    if not skip_invalid:
+        ix = min(max(ix, 0), nx - 1)
+        iy = min(max(iy, 0), ny - 1)
+        iz = min(max(iz, 0), nz - 1)
+    elif (ix < 0) | (iy < 0) | (iz < 0) | (ix >= nx) | (iy >= ny) | (iz >= nz):
+        return
+
+    cuda.atomic.add(image_values, (ix, iy, iz), v * w)
+    cuda.atomic.add(image_weights, (ix, iy, iz), w)
+
+
+# --- kernels ---
+@cuda.jit
+def grd_weighted_mean_kernel(
+    sx,
+    sy,
+    sz,
+    sv,
+    xmin,
+    xres,
+    nx,
+    ymin,
+    yres,
+    ny,
+    zmin,
+    zres,
+    nz,
+    image_values,
+    image_weights,
+    skip_invalid,
+):
+    i = cuda.grid(1)
+    if i >= sx.shape[0]:
+        return
+
+    v = sv[i]
+    if not math.isfinite(v):
+        return
+
+    # multiply with the inverse resolution (same fractions as gridfunctions)
+    fraction_index_x = (sx[i] - xmin) * (1.0 / xres)
+    fraction_index_y = (sy[i] - ymin) * (1.0 / yres)
+    fraction_index_z = (sz[i] - zmin) * (1.0 / zres)
+
+    ix1 = int(math.floor(fraction_index_x))
+    iy1 = int(math.floor(fraction_index_y))
+    iz1 = int(math.floor(fraction_index_z))
+    ix2 = ix1 + 1
+    iy2 = iy1 + 1
+    iz2 = iz1 + 1
+
+    ifraction_x = fraction_index_x - ix1
+    ifraction_y = fraction_index_y - iy1
+    ifraction_z = fraction_index_z - iz1
+    fraction_x = 1.0 - ifraction_x
+    fraction_y = 1.0 - ifraction_y
+    fraction_z = 1.0 - ifraction_z
+
+    vxy = fraction_x * fraction_y
+    vxiy = fraction_x * ifraction_y
+    vixy = ifraction_x * fraction_y
+    vixiy = ifraction_x * ifraction_y
+
+    # fmt: off
+    add_weighted_value(image_values, image_weights, ix1, iy1, iz1, v, vxy * fraction_z, nx, ny, nz, skip_invalid)
+    add_weighted_value(image_values, image_weights, ix1, iy1, iz2, v, vxy * ifraction_z, nx, ny, nz, skip_invalid)
+    add_weighted_value(image_values, image_weights, ix1, iy2, iz1, v, vxiy * fraction_z, nx, ny, nz, skip_invalid)
+    add_weighted_value(image_values, image_weights, ix1, iy2, iz2, v, vxiy * ifraction_z, nx, ny, nz, skip_invalid)
+    add_weighted_value(image_values, image_weights, ix2, iy1, iz1, v, vixy * fraction_z, nx, ny, nz, skip_invalid)
+    add_weighted_value(image_values, image_weights, ix2, iy1, iz2, v, vixy * ifraction_z, nx, ny, nz, skip_invalid)
+    add_weighted_value(image_values, image_weights, ix2, iy2, iz1, v, vixiy * fraction_z, nx, ny, nz, skip_invalid)
+    add_weighted_value(image_values, image_weights, ix2, iy2, iz2, v, vixiy * ifraction_z, nx, ny, nz, skip_invalid)
+    # fmt: on
+
+
+@cuda.jit
+def grd_block_mean_kernel(
+    sx,
+    sy,
+    sz,
+    sv,
+    xmin,
+    xres,
+    nx,
+    ymin,
+    yres,
+    ny,
+    zmin,
+    zres,
+    nz,
+    image_values,
+    image_weights,
+    skip_invalid,
+):
+    i = cuda.grid(1)
+    if i >= sx.shape[0]:
+        return
+
+    v = sv[i]
+    if not math.isfinite(v):
+        return
+
+    # divide by the resolution (same cells as gridfunctions.get_index)
+    ix = round_int((sx[i] - xmin) / xres)
+    iy = round_int((sy[i] - ymin) / yres)
+    iz = round_int((sz[i] - zmin) / zres)
+
+    add_weighted_value(
+        image_values, image_weights, ix, iy, iz, v, 1.0, nx, ny, nz, skip_invalid
+    )
+
+
+# --- host functions (same interface as the functions in gridfunctions) ---
+def _launch(
+    kernel,
+    sx: np.array,
+    sy: np.array,
+    sz: np.array,
+    sv: np.array,
+    xmin: float,
+    xres: float,
+    nx: int,
+    ymin: float,
+    yres: float,
+    ny: int,
+    zmin: float,
+    zres: float,
+    nz: int,
+    image_values: np.ndarray,
+    image_weights: np.ndarray,
+    skip_invalid: bool,
+) -> tuple:
+    num_points = len(sx)
+    if num_points == 0:
+        return image_values, image_weights
+
+    d_values = cuda.to_device(np.ascontiguousarray(image_values))
+    d_weights = cuda.to_device(np.ascontiguousarray(image_weights))
+
+    blocks = (num_points + THREADS_PER_BLOCK - 1) // THREADS_PER_BLOCK
+    kernel[blocks, THREADS_PER_BLOCK](
+        cuda.to_device(np.ascontiguousarray(sx, dtype=np.float64)),
+        cuda.to_device(np.ascontiguousarray(sy, dtype=np.float64)),
+        cuda.to_device(np.ascontiguousarray(sz, dtype=np.float64)),
+        cuda.to_device(np.ascontiguousarray(sv, dtype=image_values.dtype)),
+        xmin,
+        xres,
+        nx,
+        ymin,
+        yres,
+        ny,
+        zmin,
+        zres,
+        nz,
+        d_values,
+        d_weights,
+        skip_invalid,
+    )
+
+    image_values[:] = d_values.copy_to_host()
+    image_weights[:] = d_weights.copy_to_host()
+
+    return image_values, image_weights
+
+
+def grd_weighted_mean(
+    sx: np.array,
+    sy: np.array,
+    sz: np.array,
+    sv: np.array,
+    xmin: float,
+    xres: float,
+    nx: int,
+    ymin: float,
+    yres: float,
+    ny: int,
+    zmin: float,
+    zres: float,
+    nz: int,
+    image_values: np.ndarray,
+    image_weights: np.ndarray,
+    skip_invalid: bool = True,
+) -> tuple:
+    """CUDA version of gridfunctions.grd_weighted_mean"""
+
+    return _launch(
+        grd_weighted_mean_kernel,
+        sx,
+        sy,
+        sz,
+        sv,
+        xmin,
+        xres,
+        nx,
+        ymin,
+        yres,
+        ny,
+        zmin,
+        zres,
+        nz,
+        image_values,
+        image_weights,
+        skip_invalid,
+    )
+
+
+def grd_block_mean(
+    sx: np.array,
+    sy: np.array,
+    sz: np.array,
+    sv: np.array,
+    xmin: float,
+    xres: float,
+    nx: int,
+    ymin: float,
+    yres: float,
+    ny: int,
+    zmin: float,
+    zres: float,
+    nz: int,
+    image_values: np.ndarray,
+    image_weights: np.ndarray,
+    skip_invalid: bool = True,
+) -> tuple:
+    """CUDA version of gridfunctions.grd_block_mean"""
+
+    return _launch(
+        grd_block_mean_kernel,
+        sx,
+        sy,
+        sz,
+        sv,
+        xmin,
+        xres,
+        nx,
+        ymin,
+        yres,
+        ny,
+        zmin,
+        zres,
+        nz,
+        image_values,
+        image_weights,
+        skip_invalid,
+    )
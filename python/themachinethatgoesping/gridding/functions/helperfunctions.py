@@ -20,11 +20,19 @@ M_PI_180 = math.pi / 180
 
 MIN_DB_VALUE: float = -50.0
 
+# ---------- numba compile options ---------
+# fastmath without "nnan" and "ninf" to keep the np.isfinite checks on the input values
+# and without "arcp", so that divisions (e.g. in get_index) stay exact divisions
+FASTMATH_FLAGS = {"nsz", "contract", "afn", "reassoc"}
+NJIT_OPTIONS = dict(
+    cache=True, fastmath=FASTMATH_FLAGS, boundscheck=False, error_model="numpy"
+)
+
 # ------------------- Functions -------------------
 # Use this instead of the python internal
 
 
-@njit
+@njit(**NJIT_OPTIONS)
 def round_int(val: float) -> int:
     # Helper function: rounds float to int using decimal rounding
     # instead of pythons bankers rounding